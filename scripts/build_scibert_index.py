@@ -3,12 +3,14 @@
 Example usage:
     python scripts/build_scibert_index.py \
         --authors_dir authors_dir \
-        --output_dir output_dir
+        --output_dir output_dir \
+        --workers 4
 """
 
 import argparse
 import os
 import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from tqdm import tqdm
 
@@ -54,17 +56,30 @@ def main(
     output_dir: str,
     encoder: str,
     device: str,
+    workers: int = 1,
 ):
 
-    author_ids = [
-        d
-        for d in os.listdir(authors_dir)
-        if os.path.isdir(os.path.join(authors_dir, d))
-    ]
+    with os.scandir(authors_dir) as entries:
+        author_ids = [entry.name for entry in entries if entry.is_dir()]
 
-    for author_id in tqdm(author_ids, desc="Encoding dense vectors"):
-        docs_path = os.path.join(authors_dir, author_id)
-        encode_dense_vectors(author_id, docs_path, output_dir, encoder, device)
+    # Each author is encoded in its own pyserini subprocess, so threads are
+    # enough to keep several of them running at once.
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                encode_dense_vectors,
+                author_id,
+                os.path.join(authors_dir, author_id),
+                output_dir,
+                encoder,
+                device,
+            )
+            for author_id in author_ids
+        ]
+        for future in tqdm(
+            as_completed(futures), total=len(futures), desc="Encoding dense vectors"
+        ):
+            future.result()
 
 
 if __name__ == "__main__":
@@ -92,6 +107,12 @@ if __name__ == "__main__":
         choices=["cpu", "cuda"],
         help="Device to run encoding on",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of authors to encode in parallel",
+    )
 
     args = parser.parse_args()
-    main(args.authors_dir, args.output_dir, args.encoder, args.device)
+    main(args.authors_dir, args.output_dir, args.encoder, args.device, args.workers)
@@ -13,12 +13,16 @@ If backend is ollama:
     --output_file data/nl_profiles_classifications.jsonl \
     --llm_model_name llama3.3:70b \
     --backend ollama
+
+Use --concurrency to control how many LLM requests are in flight at once.
 """
 
 import argparse
-import json
+import asyncio
 import os
 
+import orjson
+
 from src.components import file_utils, llm_utils
 
 _PROMPT = (
@@ -57,9 +61,10 @@ _PROMPT = (
 DATASET_PATH = "data/SciNUP/dataset.jsonl"
 OUTPUT_FILE = "data/nl_profiles_classifications"
 LLM_MODEL_NAME = "openrouter/meta-llama/llama-3.3-8b-instruct:free"
+CONCURRENCY = 8
 
 
-def main(args):
+async def main(args):
     """
     Main pipeline to load data, rerank documents, and save the results.
     Accepts command-line arguments for all configurations.
@@ -75,37 +80,51 @@ def main(args):
         os.remove(args.output_file + ".tsv")
         print(f"Removed existing output file: {args.output_file}.tsv")
 
-    for author_id, nl_profile in nl_profiles.items():
-        print(f"\n--- Classifying profile for author: {author_id} ---")
-        print(f"Profile: {nl_profile[:200]}...")
-
-        prompt = _PROMPT.format(nl_profile=nl_profile)
-
-        classification = llm_utils.call_llm(
-            prompt=prompt,
-            model=args.llm_model_name,
-            backend=args.backend,
-            max_tokens=5,
-        )
-
-        print(f"Classification: {classification}")
-
-        # Save classification result
-        with open(args.output_file + ".jsonl", "a") as f:
-            json.dump(
-                {
-                    "author_id": author_id,
-                    "nl_profile": nl_profile,
-                    "classification": classification,
-                },
-                f,
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    with open(args.output_file + ".jsonl", "ab", buffering=1 << 16) as jsonl_f, open(
+        args.output_file + ".tsv", "ab", buffering=1 << 16
+    ) as tsv_f:
+
+        async def classify(author_id: str, nl_profile: str) -> None:
+            async with semaphore:
+                print(f"\n--- Classifying profile for author: {author_id} ---")
+                print(f"Profile: {nl_profile[:200]}...")
+
+                prompt = _PROMPT.format(nl_profile=nl_profile)
+
+                classification = await llm_utils.call_llm_async(
+                    prompt=prompt,
+                    model=args.llm_model_name,
+                    backend=args.backend,
+                    max_tokens=5,
+                )
+
+            print(f"Classification: {classification}")
+
+            # Save classification result. Writes do not await, so they are
+            # never interleaved between coroutines.
+            jsonl_f.write(
+                orjson.dumps(
+                    {
+                        "author_id": author_id,
+                        "nl_profile": nl_profile,
+                        "classification": classification,
+                    },
+                    option=orjson.OPT_APPEND_NEWLINE,
+                )
+            )
+            print(f"Saved classification for {author_id} to {args.output_file}.jsonl")
+            # Save as tsv for easier viewing
+            tsv_f.write(f"{author_id}\t{classification}\n".encode())
+            print(f"Saved classification for {author_id} to {args.output_file}.tsv")
+
+        await asyncio.gather(
+            *(
+                classify(author_id, nl_profile)
+                for author_id, nl_profile in nl_profiles.items()
             )
-            f.write("\n")
-        print(f"Saved classification for {author_id} to {args.output_file}.jsonl")
-        # Save as tsv for easier viewing
-        with open(args.output_file + ".tsv", "a") as f:
-            f.write(f"{author_id}\t{classification}\n")
-        print(f"Saved classification for {author_id} to {args.output_file}.tsv")
+        )
 
 
 if __name__ == "__main__":
@@ -141,6 +160,12 @@ if __name__ == "__main__":
         default="openrouter",
         help="Backend to use for LLM inference: 'openrouter' or 'ollama'.",
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=CONCURRENCY,
+        help="Maximum number of concurrent LLM requests.",
+    )
 
     args = parser.parse_args()
-    main(args)
+    asyncio.run(main(args))
@@ -50,11 +50,8 @@ def create_index(author_id: str, docs_path: str, output_dir: str) -> None:
 
 
 def main(authors_dir: str, output_dir: str):
-    author_ids = [
-        d
-        for d in os.listdir(authors_dir)
-        if os.path.isdir(os.path.join(authors_dir, d))
-    ]
+    with os.scandir(authors_dir) as entries:
+        author_ids = [entry.name for entry in entries if entry.is_dir()]
 
     for author_id in tqdm(author_ids, desc="Indexing authors"):
         docs_path = os.path.join(authors_dir, author_id)
@@ -2,12 +2,13 @@
 users."""
 
 import argparse
-import ast
-import json
 import logging
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import Optional
 
+import orjson
 import pandas as pd
 from openai import RateLimitError
 from tqdm import tqdm
@@ -24,13 +25,18 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
-CANDIDATE_USERS_CSV_PATH = "data/preprocessed/candidate_users.csv"
-METADATA_CSV_PATH = "data/preprocessed/arxiv-metadata.csv"
-CITATIONS_CSV_PATH = "data/preprocessed/citations.csv"
+CANDIDATE_USERS_PARQUET_PATH = "data/preprocessed/candidate_users.parquet"
+METADATA_PARQUET_PATH = "data/preprocessed/arxiv-metadata.parquet"
+CITATIONS_PARQUET_PATH = "data/preprocessed/citations.parquet"
 INPUT_JSONL_PATH = "data/SciNUP/sampled_users.jsonl"
 AUTHORS_SPLIT_CSV_PATH = "data/SciNUP/authors_split.csv"
 DATASET_JSONL_PATH = "data/SciNUP/dataset.jsonl"
 
+# Minimum number of seconds between two profile generation requests
+MIN_REQUEST_INTERVAL = 3.1
+# Number of retries for a profile generation request that is rate limited
+MAX_RATE_LIMIT_RETRIES = 3
+
 PROFILE_GENERATION_PROMPT_A = (
     "Below are the titles and abstracts of scientific papers I have authored. "
     "Based on this information, generate a concise first-person research "
@@ -99,53 +105,89 @@ def generate_dataset(
     author_split_dict = dict(zip(authors_split["author_id"], authors_split["split"]))
 
     logger.info(f"Generating dataset from {len(authors_list)} sampled users.")
-    with open(output_json_file, "w") as file:
-        for author in tqdm(authors_list, desc="Generating dataset"):
+    last_request_time = 0.0
+    # Candidates for the next author are generated while waiting for the LLM
+    with open(output_json_file, "wb", buffering=1 << 20) as file, ThreadPoolExecutor(
+        max_workers=1
+    ) as executor:
+        next_candidates = (
+            executor.submit(candidate_generator.generate_candidates, authors_list[0])
+            if authors_list
+            else None
+        )
+        for i, author in enumerate(tqdm(authors_list, desc="Generating dataset")):
             author.split = author_split_dict.get(author.author_id)
             logger.info(f"Processing user {author.author_id} with split {author.split}")
             model_name = SPLIT_DICT[author.split]["model"]
             profile_prompt = SPLIT_DICT[author.split]["prompt"]
 
-            candidate_items = candidate_generator.generate_candidates(author)
+            candidate_items = next_candidates.result()
             logger.info(f"Candidates generated for user {author.author_id}")
             author.candidate_items = candidate_items
-            try:
-                profile = profile_generator.generate_profile(
-                    author.nl_profile_input, profile_prompt, model_name
+            if i + 1 < len(authors_list):
+                next_candidates = executor.submit(
+                    candidate_generator.generate_candidates, authors_list[i + 1]
                 )
-                logger.info(
-                    f"NL profile generated for user {author.author_id}: "
-                    + f"using model {model_name}"
+
+            profile = "Profile was not able to generate"
+            for _ in range(MAX_RATE_LIMIT_RETRIES + 1):
+                # Only wait for whatever is left of the minimum request interval
+                time.sleep(
+                    max(0.0, last_request_time + MIN_REQUEST_INTERVAL - time.time())
                 )
-            except RateLimitError as e:
-                logger.info("API request limit reached.")
-                print(e)
-                profile = "Profile was not able to generate"
+                last_request_time = time.time()
+                try:
+                    profile = profile_generator.generate_profile(
+                        author.nl_profile_input, profile_prompt, model_name
+                    )
+                    logger.info(
+                        f"NL profile generated for user {author.author_id}: "
+                        + f"using model {model_name}"
+                    )
+                    break
+                except RateLimitError as e:
+                    logger.info("API request limit reached.")
+                    print(e)
+                    time.sleep(_get_retry_after(e) or MIN_REQUEST_INTERVAL)
             logger.info(profile)
             author.nl_profile = profile
-            time.sleep(3.1)
             file.write(
-                author.to_json(["nl_profile", "candidate_items", "split"]) + "\n"
+                author.to_jsonl_bytes(["nl_profile", "candidate_items", "split"])
             )
 
     logger.info("Dataset generation completed")
     logger.info(f"saved to {output_json_file}")
 
 
+def _get_retry_after(error: RateLimitError) -> Optional[float]:
+    """Returns the number of seconds to wait as suggested by the API, if any."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
 def read_sampled_users(
     input_jsonl_path: str = INPUT_JSONL_PATH,
 ) -> list[Author]:
 
     with open(input_jsonl_path) as f:
-        data = [json.loads(line, object_hook=_date_hook) for line in f]
+        data = [orjson.loads(line) for line in f]
 
     logger.info(f"Read {len(data)} sampled users' data.")
+    # orjson has no object_hook, so dates are parsed per article instead.
     authors = [
         Author(
             author["author_id"],
             author["author_name"],
-            [Article(**article) for article in author["nl_profile_input"]],
-            [Article(**article) for article in author["ground_truth_items"]],
+            [Article(**_date_hook(article)) for article in author["nl_profile_input"]],
+            [
+                Article(**_date_hook(article))
+                for article in author["ground_truth_items"]
+            ],
         )
         for author in data
     ]
@@ -185,19 +227,10 @@ if __name__ == "__main__":
     if args.debug:
         logger.setLevel(logging.DEBUG)
 
-    metadata = pd.read_csv(
-        METADATA_CSV_PATH,
-        dtype={"article_id": "string"},
-        converters={"authors_parsed": ast.literal_eval},
-        parse_dates=["update_date"],
-    )
+    metadata = pd.read_parquet(METADATA_PARQUET_PATH)
     logger.info("metadata read")
 
-    citations_df = pd.read_csv(
-        CITATIONS_CSV_PATH,
-        dtype={"article_id": "string", "num_references": "int"},
-        converters={"references": ast.literal_eval},
-    )
+    citations_df = pd.read_parquet(CITATIONS_PARQUET_PATH)
     logger.info("citations dataset read")
 
     authors_list = read_sampled_users()
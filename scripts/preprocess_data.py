@@ -1,55 +1,53 @@
 """Preprocesses the data."""
 
-import ast
 import json
 import re
+import sys
 import unicodedata
+from functools import lru_cache
+from itertools import chain
 
 import pandas as pd
+import pyarrow.json as paj
 
 # Constants for file paths
 CITATIONS_JSON_PATH = "data/raw/internal-references-v0.2.0-2019-03-01.json"
-CITATIONS_CSV_PATH = "data/preprocessed/citations.csv"
+CITATIONS_PARQUET_PATH = "data/preprocessed/citations.parquet"
 KAGGLE_METADATA_PATH = "data/raw/arxiv-metadata-oai-snapshot.json"
 GITHUB_METADATA_PATH = "data/raw/arxiv-metadata-hash-abstracts-v0.2.0-2019-03-01.json"
-METADATA_CSV_PATH = "data/preprocessed/arxiv-metadata.csv"
-AUTHORS_CSV_PATH = "data/preprocessed/authors.csv"
-CANDIDATE_USERS_CSV_PATH = "data/preprocessed/candidate_users.csv"
+METADATA_PARQUET_PATH = "data/preprocessed/arxiv-metadata.parquet"
+AUTHORS_PARQUET_PATH = "data/preprocessed/authors.parquet"
+CANDIDATE_USERS_PARQUET_PATH = "data/preprocessed/candidate_users.parquet"
 N_MINIMUM_PAPERS = 5
 
 
 def main() -> None:
     # Citations
-    preprocess_citations(CITATIONS_JSON_PATH, CITATIONS_CSV_PATH)
-    citations = pd.read_csv(
-        CITATIONS_CSV_PATH,
-        dtype={"article_id": "string", "num_references": "int"},
-    )
-    citations["references"] = citations["references"].apply(ast.literal_eval)
+    citations = preprocess_citations(CITATIONS_JSON_PATH, CITATIONS_PARQUET_PATH)
 
     # Metadata
-    preprocess_metadata(METADATA_CSV_PATH, citations.article_id.tolist())
+    preprocess_metadata(METADATA_PARQUET_PATH, set(citations.article_id))
 
     # Authors
-    _create_authors_df(METADATA_CSV_PATH, AUTHORS_CSV_PATH)
-    _filter_authors(CANDIDATE_USERS_CSV_PATH)
+    _create_authors_df(METADATA_PARQUET_PATH, AUTHORS_PARQUET_PATH)
+    _filter_authors(CANDIDATE_USERS_PARQUET_PATH)
 
 
-def preprocess_metadata(output_path: str, citation_ids: list[str]) -> None:
+def preprocess_metadata(output_path: str, citation_ids: set[str]) -> None:
     """Merges github and Kaggle versions of arxiv datasets and saves the merged
-    dataframe to a CSV file.
+    dataframe to a Parquet file.
 
     Args:
-        output_path: Path to save the merged CSV file.
-        citation_ids: List of article IDs present in citations dataframe.
+        output_path: Path to save the merged Parquet file.
+        citation_ids: Set of article IDs present in citations dataframe.
     """
 
     # Read ArXiv metadata github & Kaggle versions
     print("preprocessing metadata...")
-    df = pd.read_json(KAGGLE_METADATA_PATH, lines=True)
-    df["id"] = df["id"].apply(lambda x: str(x).strip())
-    df1 = pd.read_json(GITHUB_METADATA_PATH, lines=True)
-    df1["id"] = df1["id"].apply(lambda x: str(x).strip())
+    df = paj.read_json(KAGGLE_METADATA_PATH).to_pandas()
+    df["id"] = df["id"].astype("string").str.strip()
+    df1 = paj.read_json(GITHUB_METADATA_PATH).to_pandas()
+    df1["id"] = df1["id"].astype("string").str.strip()
 
     # Merge them and make sure there are no duplicates
     df = df.merge(df1[["id"]], on="id")
@@ -57,26 +55,30 @@ def preprocess_metadata(output_path: str, citation_ids: list[str]) -> None:
 
     # Fill in date column and format it correctly
     df["update_date"] = pd.to_datetime(df["update_date"])
-    df.update_date = df.update_date.where(
-        df.update_date.notnull(),
-        df.versions.apply(lambda x: pd.to_datetime(x[0]["created"])),
-    )
+    missing_date = df["update_date"].isna()
+    first_created = df.loc[missing_date, "versions"].map(lambda x: x[0]["created"])
+    df.loc[missing_date, "update_date"] = pd.to_datetime(
+        first_created, utc=True
+    ).dt.tz_convert(None)
 
     # Filter the dataframe to include only the IDs present in the citations
     # dataframe and save it to the same path
     df = df[df.id.isin(citation_ids)].reset_index(drop=True)
     df.rename(columns={"id": "article_id"}, inplace=True)
-    df.to_csv(output_path, index=False)
+    df.to_parquet(output_path, index=False)
     print("metadata preprocessed and saved to ", output_path)
 
 
-def preprocess_citations(json_path: str, output_path: str) -> None:
+def preprocess_citations(json_path: str, output_path: str) -> pd.DataFrame:
     """Preprocesses citations data by loading the JSON file, extracts relevant
-    information and saves it to a CSV file.
+    information and saves it to a Parquet file.
 
     Args:
         json_path: Path to the input JSON file containing citations data.
-        output_path: Path to save the preprocessed CSV file.
+        output_path: Path to save the preprocessed Parquet file.
+
+    Returns:
+        Preprocessed citations DataFrame.
     """
     print("preprocessing citations...")
     with open(json_path) as f:
@@ -85,55 +87,51 @@ def preprocess_citations(json_path: str, output_path: str) -> None:
     citations = pd.DataFrame(refs.items(), columns=["id", "references"])
     citations["num_references"] = citations["references"].apply(len)
     citations = citations[citations["num_references"] > 0].reset_index(drop=True)
-    citations["id"] = citations["id"].apply(lambda x: str(x).strip())
+    citations["id"] = citations["id"].astype("string").str.strip()
     citations.rename(columns={"id": "article_id"}, inplace=True)
-    citations.to_csv(output_path, index=False)
+    citations.to_parquet(output_path, index=False)
     print("citations data preprocessed and saved to", output_path)
+    return citations
 
 
-def _create_authors_df(metadata_csv_path: str, output_path: str) -> None:
-    """Creates a DataFrame of authors from the metadata CSV file, grouping their
-    papers and categories as lists into corresponding columns.
+def _create_authors_df(metadata_path: str, output_path: str) -> None:
+    """Creates a DataFrame of authors from the metadata Parquet file, grouping
+    their papers and categories as lists into corresponding columns.
 
     Args:
+        metadata_path: Path to the preprocessed metadata Parquet file.
         output_path: Path to save the authors DataFrame.
     """
     print("creating authors dataframe...")
-    df = pd.read_csv(metadata_csv_path, dtype={"article_id": "string"})
-    authors = df[["article_id", "authors_parsed", "categories"]]
-    authors.rename(columns={"article_id": "authored_paper_ids"}, inplace=True)
-    authors.loc[:, "authors_parsed"] = authors["authors_parsed"].apply(ast.literal_eval)
-    authors.loc[:, "categories"] = authors["categories"].apply(
-        lambda x: str(x).strip().split(" ")
+    df = pd.read_parquet(
+        metadata_path, columns=["article_id", "authors_parsed", "categories"]
+    )
+    authors = df.rename(columns={"article_id": "authored_paper_ids"}).assign(
+        categories=df["categories"].astype(str).str.strip().str.split(" ")
     )
-    author = (
-        authors.apply(lambda x: pd.Series(x["authors_parsed"]), axis=1)
-        .stack()
-        .reset_index(level=1, drop=True)
+    authors = authors.explode("authors_parsed", ignore_index=True).dropna(
+        subset=["authors_parsed"]
     )
-    author.name = "author_name"
-    authors = authors.drop("authors_parsed", axis=1).join(author)
-    authors["author_name"] = pd.Series(authors["author_name"], dtype=object)
-    authors["author_name"] = authors["author_name"].apply(lambda x: " ".join(x))
+    authors["author_name"] = authors["authors_parsed"].map(" ".join)
+    authors = authors.drop(columns="authors_parsed")
 
     # Normalize author names
-    authors["author_name"] = authors["author_name"].apply(_normalize_author_name)
-    authors = authors[authors["author_name"].apply(_is_valid_name)]
+    authors["author_name"] = _normalize_author_names(authors["author_name"])
+    authors = authors[_valid_names_mask(authors["author_name"])]
 
     # Create id column and group by it
-    authors["author_id"] = authors["author_name"].apply(
-        lambda x: _generate_base_id(x) + "_1"
-    )
+    authors["author_id"] = _generate_base_ids(authors["author_name"]) + "_1"
     authors = authors.groupby("author_id").agg(list).reset_index()
-    authors.loc[:, "categories"] = authors["categories"].apply(
-        lambda x: set([i for y in x for i in y])
+    # Sets are stored as sorted lists, since Parquet has no set type
+    authors = authors.assign(
+        categories=authors["categories"].map(
+            lambda x: sorted(set(chain.from_iterable(x)))
+        ),
+        author_name=authors["author_name"].map(lambda x: sorted(set(x))),
+        num_papers=authors["authored_paper_ids"].str.len(),
     )
-    authors.loc[:, "author_name"] = authors["author_name"].apply(set)
-
-    authors["num_papers"] = authors["authored_paper_ids"].apply(len)
-    authors.reset_index(drop=True, inplace=True)
 
-    authors.to_csv(AUTHORS_CSV_PATH, index=False)
+    authors.to_parquet(output_path, index=False)
     print("authors data preprocessed and saved to", output_path)
 
 
@@ -146,11 +144,11 @@ def _filter_authors(output_path: str, n_minimum_papers: int = N_MINIMUM_PAPERS)
         n_minimum_papers: Minimum number of papers for an author to be included.
     """
     print("filtering authors...")
-    authors = pd.read_csv(AUTHORS_CSV_PATH)
+    authors = pd.read_parquet(AUTHORS_PARQUET_PATH)
 
     authors = authors[authors.num_papers >= n_minimum_papers]
 
-    authors.to_csv(output_path, index=False)
+    authors.to_parquet(output_path, index=False)
     print("authors data filtered and saved to", output_path)
 
 
@@ -186,6 +184,46 @@ def _is_valid_name(name: str) -> bool:
     return True
 
 
+def _valid_names_mask(names: pd.Series) -> pd.Series:
+    """Vectorized version of `_is_valid_name`.
+
+    Args:
+        names: Series of author names to be checked.
+
+    Returns:
+        Boolean Series, True where the name is considered valid.
+    """
+    names = names.astype("string")
+    return (
+        names.fillna("").str.len().gt(0)
+        # Presence of alphabetic characters and at least two alphabetic tokens
+        & names.str.count(r"(?<!\w)\w*[^\W\d_]\w*").ge(2)
+        & ~names.str.contains(r"\d", regex=True)
+        & names.str.count(",").le(5)
+        & names.str.split().str.len().le(5)
+    ).fillna(False)
+
+
+def _normalize_author_names(names: pd.Series) -> pd.Series:
+    """Vectorized version of `_normalize_author_name`.
+
+    Args:
+        names: Series of author names to be normalized.
+
+    Returns:
+        Series of normalized author names.
+    """
+    return (
+        names.str.normalize("NFKD")
+        .str.replace(_combining_chars_re(), "", regex=True)
+        .str.lower()
+        .str.replace("collaboration", "", regex=False)
+        .str.replace(r"[^\w\s]", "", regex=True)
+        .str.replace(r"\s+", " ", regex=True)
+        .str.strip()
+    )
+
+
 def _normalize_author_name(name: str) -> str:
     """Normalizes an author name: lowercasing, removing punctuation, collapsing
     whitespace, converting accents.
@@ -214,5 +252,38 @@ def _generate_base_id(name: str) -> str:
     return "unknown"
 
 
+def _generate_base_ids(names: pd.Series) -> pd.Series:
+    """Vectorized version of `_generate_base_id`.
+
+    Args:
+        names: Series of normalized author names.
+
+    Returns:
+        Series of base IDs in the form "surname_initial", or "unknown" for
+        names with fewer than two tokens.
+    """
+    tokens = names.str.split()
+    first_initial = tokens.str[1].str[0]
+    return (tokens.str[0] + "_" + first_initial).where(first_initial.notna(), "unknown")
+
+
+@lru_cache(maxsize=None)
+def _combining_chars_re() -> re.Pattern:
+    """Returns a pattern matching any combining character, i.e., accents left
+    over after NFKD.
+
+    Built on first use, as it scans all Unicode code points.
+    """
+    return re.compile(
+        "["
+        + "".join(
+            re.escape(chr(code_point))
+            for code_point in range(sys.maxunicode + 1)
+            if unicodedata.combining(chr(code_point))
+        )
+        + "]"
+    )
+
+
 if __name__ == "__main__":
     main()
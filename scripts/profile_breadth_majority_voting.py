@@ -1,4 +1,6 @@
-import collections
+import csv
+
+import pandas as pd
 
 # Input files
 files = [
@@ -10,26 +12,33 @@ files = [
 # Output file
 output_file = "data/SciNUP/breadth_classification.tsv"
 
-votes = collections.defaultdict(list)
-
-for f in files:
-    with open(f, "r", encoding="utf-8") as infile:
-        for line in infile:
-            line = line.strip()
-            if not line:
-                continue
-            author_id, label = line.split("\t")
-            votes[author_id].append(label)
-
-with open(output_file, "w", encoding="utf-8") as outfile:
-    for author_id, labels in votes.items():
-        counter = collections.Counter(labels)
-
-        if len(counter) == 3:  # all three different
-            majority_label = "Medium"  # default to Medium
-        else:
-            majority_label = counter.most_common(1)[0][0]
-
-        outfile.write(f"{author_id}\t{majority_label}\n")
+votes = pd.concat(
+    (
+        pd.read_csv(
+            f,
+            sep="\t",
+            header=None,
+            names=["author_id", "label"],
+            dtype=str,
+            quoting=csv.QUOTE_NONE,
+            keep_default_na=False,
+        )
+        for f in files
+    ),
+    ignore_index=True,
+)
+votes["label"] = votes["label"].str.strip()
+
+# Votes per (author, label), in order of first appearance
+label_counts = (
+    votes.groupby(["author_id", "label"], sort=False).size().reset_index(name="count")
+)
+by_author = label_counts.groupby("author_id", sort=False)
+# idxmax keeps the first label among ties, like Counter.most_common
+majority = label_counts.loc[by_author["count"].idxmax()].set_index("author_id")
+# Default to Medium when all three labels are different
+majority["label"] = majority["label"].where(by_author.size() != 3, "Medium")
+
+majority["label"].to_csv(output_file, sep="\t", header=False, quoting=csv.QUOTE_NONE)
 
 print(f"Majority vote classifications written to {output_file}")
@@ -16,21 +16,31 @@ Usage examples:
        --output_path data/retrieval/results_dense_flag.trec \
        --top_k 100
 
-3. Use GPU (cuda:0) and disable fp16:
+3. Use GPU (cuda:0) with bf16 weights:
    $ python run_bge_retrieval.py \
-       --device cuda:0 \
-       --no_fp16
+       --devices cuda:0 \
+       --dtype bf16
 
-4. Use a different FlagReranker model and custom run name:
+4. Use an ONNX export of the model with ONNX Runtime (TensorRT/CUDA):
+   $ python run_bge_retrieval.py \
+       --engine onnx \
+       --model_name bge-reranker-large-onnx \
+       --devices cuda:0
+
+5. Use a different FlagReranker model and custom run name:
    $ python run_bge_retrieval.py \
        --model_name BAAI/bge-reranker-base \
        --run_name my_reranker_run
 """
 
 import argparse
-import json
+import heapq
 import os
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
 
+import orjson
+import torch
 from FlagEmbedding import (
     FlagLLMReranker,
     FlagReranker,
@@ -40,23 +50,123 @@ from FlagEmbedding import (
 from tqdm import tqdm
 
 
-def init_model(model_name="BAAI/bge-reranker-large", use_fp16=True, devices=["cpu"]):
+def score_longest_first(items, length, forward, batch_size=512):
+    """
+    Scores items in batches, longest first, so that each batch is padded to
+    similar lengths.
+
+    length(item) gives the length used for sorting and forward(batch) returns
+    the scores of a list of items. Scores are returned in the input order.
+    """
+    order = sorted(range(len(items)), key=lambda i: -length(items[i]))
+    scores = [0.0] * len(items)
+    for start in range(0, len(order), batch_size):
+        batch_idx = order[start : start + batch_size]
+        batch_scores = forward([items[i] for i in batch_idx])
+        for i, score in zip(batch_idx, batch_scores):
+            scores[i] = score
+    return scores
+
+
+class ORTReranker:
+    """
+    Cross-encoder reranker running an ONNX export of a bge-reranker model with
+    ONNX Runtime, exposing the same compute_score interface as FlagReranker.
+
+    The model directory is created with, e.g.:
+       $ optimum-cli export onnx --model BAAI/bge-reranker-large \
+           --task text-classification bge-reranker-large-onnx/
+    On GPU the TensorRT execution provider is tried first, falling back to
+    CUDA and then CPU.
+    """
+
+    def __init__(self, model_dir, use_fp16=True, devices=["cpu"], max_length=512):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.max_length = max_length
+        device = devices[0]
+        if device.startswith("cuda"):
+            device_id = int(device.partition(":")[2] or 0)
+            providers = [
+                (
+                    "TensorrtExecutionProvider",
+                    {"device_id": device_id, "trt_fp16_enable": use_fp16},
+                ),
+                ("CUDAExecutionProvider", {"device_id": device_id}),
+                "CPUExecutionProvider",
+            ]
+        else:
+            providers = ["CPUExecutionProvider"]
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, "model.onnx"), providers=providers
+        )
+        self.input_names = {node.name for node in self.session.get_inputs()}
+
+    def compute_score(self, pairs, batch_size=512):
+        return score_longest_first(
+            pairs, lambda pair: len(pair[1]), self._forward, batch_size
+        )
+
+    def _forward(self, pairs):
+        """Returns the logits of a batch of (query, doc) pairs."""
+        inputs = self.tokenizer(
+            pairs,
+            padding=True,
+            truncation=True,
+            max_length=self.max_length,
+            return_tensors="np",
+        )
+        feed = {
+            name: array.astype("int64")
+            for name, array in inputs.items()
+            if name in self.input_names
+        }
+        return self.session.run(None, feed)[0].reshape(-1).tolist()
+
+
+def init_model(
+    model_name="BAAI/bge-reranker-large", dtype="fp16", devices=["cpu"], engine="flag"
+):
+    """
+    Loads the reranker with weights in the given precision.
+
+    fp16/fp32 are handled by FlagEmbedding itself; bf16 casts the loaded model
+    and int8 applies dynamic quantization to its linear layers (CPU only). With
+    engine="onnx", model_name is a directory with an ONNX export, dtype only
+    toggles TensorRT fp16, and int8 requires an already quantized export.
+    """
+    if engine == "onnx":
+        return ORTReranker(model_name, use_fp16=dtype == "fp16", devices=devices)
+    if dtype == "int8" and any(device != "cpu" for device in devices):
+        raise ValueError("int8 dynamic quantization is only supported on CPU")
+    use_fp16 = dtype == "fp16"
     if "v2-gemma" in model_name:
-        return FlagLLMReranker(model_name, use_fp16=use_fp16, devices=devices)
-    if "v2-minicpm-layerwise" in model_name:
-        return LayerWiseFlagLLMReranker(model_name, use_fp16=use_fp16, devices=devices)
-    if "v2.5-gemma2-lightweight" in model_name:
-        return LightWeightFlagLLMReranker(
+        model = FlagLLMReranker(model_name, use_fp16=use_fp16, devices=devices)
+    elif "v2-minicpm-layerwise" in model_name:
+        model = LayerWiseFlagLLMReranker(model_name, use_fp16=use_fp16, devices=devices)
+    elif "v2.5-gemma2-lightweight" in model_name:
+        model = LightWeightFlagLLMReranker(
             model_name, use_fp16=use_fp16, devices=devices
         )
-    return FlagReranker(model_name, use_fp16=use_fp16, devices=devices)
+    else:
+        model = FlagReranker(model_name, use_fp16=use_fp16, devices=devices)
+
+    if dtype == "bf16":
+        model.model = model.model.to(torch.bfloat16)
+    elif dtype == "int8":
+        model.model = torch.ao.quantization.quantize_dynamic(
+            model.model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+    return model
 
 
 def load_author_profiles(profiles_path):
     profiles = {}
-    with open(profiles_path, "r", encoding="utf-8") as f:
+    with open(profiles_path, "rb") as f:
         for line in f:
-            entry = json.loads(line)
+            entry = orjson.loads(line)
             profiles[entry["author_id"]] = entry["nl_profile"]
     return profiles
 
@@ -69,9 +179,9 @@ def load_author_docs(docs_base_path, author_id):
     seen = set()
     docs = []
     if os.path.exists(docs_path):
-        with open(docs_path, "r", encoding="utf-8") as f:
+        with open(docs_path, "rb") as f:
             for line in f:
-                entry = json.loads(line)
+                entry = orjson.loads(line)
                 doc_id = entry["id"]
                 if doc_id not in seen:
                     docs.append(entry)
@@ -79,50 +189,177 @@ def load_author_docs(docs_base_path, author_id):
     return docs
 
 
-def score_docs_for_author(model, author_id, nl_profile, docs, top_k=100):
-    pairs = [[nl_profile, doc["contents"]] for doc in docs]
-    if not pairs:
-        return []
+def compute_scores(model, pairs, batch_size=512):
+    """Scores (profile, document) pairs with a single model call."""
     if isinstance(model, LayerWiseFlagLLMReranker):
-        scores = model.compute_score(pairs, cutoff_layers=[28])
-    elif isinstance(model, LightWeightFlagLLMReranker):
-        scores = model.compute_score(
+        return model.compute_score(pairs, batch_size=batch_size, cutoff_layers=[28])
+    if isinstance(model, LightWeightFlagLLMReranker):
+        return model.compute_score(
             pairs,
+            batch_size=batch_size,
             cutoff_layers=[28],
             compress_ratio=2,
             compress_layers=[24, 40],
         )
+    return model.compute_score(pairs, batch_size=batch_size)
+
+
+@torch.no_grad()
+def compute_scores_cached_profiles(
+    model, author_batch, device, batch_size=512, max_length=512
+):
+    """
+    Cross-encoder scoring that tokenizes each author's profile once and reuses
+    its input IDs for all of the author's docs, instead of tokenizing the same
+    profile again for every (profile, doc) pair.
+
+    Mirrors FlagReranker.compute_score: the profile is truncated to 3/4 of
+    max_length, pairs are truncated on the doc side, and raw logits are
+    returned. Only for single-device FlagReranker (not the LLM rerankers).
+    """
+    tokenizer = model.tokenizer
+    encoder = model.model.to(device).eval()
+    if getattr(model, "use_fp16", False) and device != "cpu":
+        encoder = encoder.half()
+
+    inputs = []
+    for _, nl_profile, docs in author_batch:
+        if not docs:
+            continue
+        profile_ids = tokenizer(
+            nl_profile,
+            add_special_tokens=False,
+            truncation=True,
+            max_length=max_length * 3 // 4,
+        )["input_ids"]
+        docs_ids = tokenizer(
+            [doc["contents"] for doc in docs],
+            add_special_tokens=False,
+            truncation=True,
+            max_length=max_length,
+        )["input_ids"]
+        inputs.extend(
+            tokenizer.prepare_for_model(
+                profile_ids,
+                doc_ids,
+                truncation="only_second",
+                max_length=max_length,
+                padding=False,
+            )
+            for doc_ids in docs_ids
+        )
+
+    def forward(batch_inputs):
+        batch = tokenizer.pad(batch_inputs, padding=True, return_tensors="pt")
+        logits = encoder(**batch.to(device), return_dict=True).logits
+        return logits.view(-1).float().tolist()
+
+    return score_longest_first(
+        inputs, lambda encoded: len(encoded["input_ids"]), forward, batch_size
+    )
+
+
+def score_docs_for_authors(
+    model, author_batch, top_k=100, batch_size=512, profile_cache_device=None
+):
+    """
+    Scores the docs of several authors at once, so that small per-author doc
+    lists are packed into full model batches.
+
+    author_batch is a list of (author_id, nl_profile, docs) tuples. Returns
+    {author_id: [(doc_id, score), ...]} with the top-k docs per author. If
+    profile_cache_device is set, profiles are tokenized once per author (see
+    compute_scores_cached_profiles).
+    """
+    offsets = [0]
+    for _, _, docs in author_batch:
+        offsets.append(offsets[-1] + len(docs))
+    if offsets[-1] == 0:
+        scores = []
+    elif profile_cache_device is not None:
+        scores = compute_scores_cached_profiles(
+            model, author_batch, profile_cache_device, batch_size=batch_size
+        )
     else:
-        scores = model.compute_score(pairs)
-    scored_docs = [(doc["id"], float(score)) for doc, score in zip(docs, scores)]
-    scored_docs.sort(key=lambda x: x[1], reverse=True)
-    return scored_docs[:top_k]
+        pairs = [
+            [nl_profile, doc["contents"]]
+            for _, nl_profile, docs in author_batch
+            for doc in docs
+        ]
+        scores = compute_scores(model, pairs, batch_size=batch_size)
+
+    results = {}
+    for i, (author_id, _, docs) in enumerate(author_batch):
+        author_scores = scores[offsets[i] : offsets[i + 1]]
+        # O(N log k) top-k selection instead of sorting all N docs
+        results[author_id] = heapq.nlargest(
+            top_k,
+            ((doc["id"], float(score)) for doc, score in zip(docs, author_scores)),
+            key=itemgetter(1),
+        )
+    return results
 
 
-def write_trec_results(all_results, output_path, run_name="flag_reranker"):
-    with open(output_path, "w", encoding="utf-8") as f:
-        for author_id, scored_docs in all_results.items():
-            for rank, (doc_id, score) in enumerate(scored_docs, start=1):
-                f.write(f"{author_id} Q0 {doc_id} {rank} {score} {run_name}\n")
+def write_trec_results(f, results, run_name="flag_reranker"):
+    """Appends {author_id: scored_docs} results in TREC format to open file f."""
+    f.writelines(
+        f"{author_id} Q0 {doc_id} {rank} {score} {run_name}\n"
+        for author_id, scored_docs in results.items()
+        for rank, (doc_id, score) in enumerate(scored_docs, start=1)
+    )
 
 
 def main(args):
     model = init_model(
         model_name=args.model_name,
-        use_fp16=not args.no_fp16,
+        dtype=args.dtype,
         devices=args.devices,
+        engine=args.engine,
     )
     profiles = load_author_profiles(args.profiles_path)
 
-    all_results = {}
-    for author_id, nl_profile in tqdm(profiles.items(), desc="Authors"):
-        docs = load_author_docs(args.docs_base_path, author_id)
-        scored_docs = score_docs_for_author(
-            model, author_id, nl_profile, docs, top_k=args.top_k
-        )
-        all_results[author_id] = scored_docs
+    # Plain cross-encoders on a single device tokenize each profile only once
+    profile_cache_device = (
+        args.devices[0]
+        if type(model) is FlagReranker and len(args.devices) == 1
+        else None
+    )
+
+    author_ids = list(profiles)
+    batch_size = args.authors_per_batch
+    with ThreadPoolExecutor(max_workers=args.io_workers) as executor, open(
+        args.output_path, "w", encoding="utf-8"
+    ) as out, tqdm(total=len(author_ids), desc="Authors") as pbar:
+
+        def submit_batch(start):
+            return [
+                (
+                    author_id,
+                    executor.submit(load_author_docs, args.docs_base_path, author_id),
+                )
+                for author_id in author_ids[start : start + batch_size]
+            ]
+
+        # Docs of the next batch are read from disk while the current one is scored
+        next_batch = submit_batch(0)
+        for start in range(0, len(author_ids), batch_size):
+            current_batch, next_batch = next_batch, submit_batch(start + batch_size)
+            author_batch = [
+                (author_id, profiles[author_id], docs.result())
+                for author_id, docs in current_batch
+            ]
+            results = score_docs_for_authors(
+                model,
+                author_batch,
+                top_k=args.top_k,
+                batch_size=args.batch_size,
+                profile_cache_device=profile_cache_device,
+            )
+            # Written as soon as scored instead of kept for all authors
+            write_trec_results(out, results, run_name=args.run_name)
+            out.flush()
+            pbar.update(len(author_batch))
 
-    write_trec_results(all_results, args.output_path, run_name=args.run_name)
     print(f"TREC results written to {args.output_path}")
 
 
@@ -154,6 +391,24 @@ if __name__ == "__main__":
         default=100,
         help="Number of top documents to return per author",
     )
+    parser.add_argument(
+        "--batch_size",
+        type=int,
+        default=512,
+        help="Number of (profile, document) pairs per model forward batch",
+    )
+    parser.add_argument(
+        "--authors_per_batch",
+        type=int,
+        default=16,
+        help="Number of authors whose documents are scored in one model call",
+    )
+    parser.add_argument(
+        "--io_workers",
+        type=int,
+        default=4,
+        help="Number of threads loading author docs ahead of scoring",
+    )
     parser.add_argument(
         "--model_name",
         type=str,
@@ -173,8 +428,29 @@ if __name__ == "__main__":
         help="Run name in TREC file",
     )
     parser.add_argument(
-        "--no_fp16", action="store_true", help="Disable fp16 even if available"
+        "--engine",
+        choices=["flag", "onnx"],
+        default="flag",
+        help="Inference engine; onnx expects --model_name to be an ONNX export dir",
+    )
+    parser.add_argument(
+        "--dtype",
+        choices=["fp32", "fp16", "bf16", "int8"],
+        default=None,
+        help="Model precision (default: fp16); bf16 needs Ampere or newer GPUs, "
+        "int8 is CPU only",
+    )
+    parser.add_argument(
+        "--no_fp16",
+        action="store_true",
+        help="Deprecated alias for --dtype fp32",
     )
 
     args = parser.parse_args()
+    if args.no_fp16:
+        if args.dtype not in (None, "fp32"):
+            parser.error(f"--no_fp16 conflicts with --dtype {args.dtype}")
+        args.dtype = "fp32"
+    elif args.dtype is None:
+        args.dtype = "fp16"
     main(args)
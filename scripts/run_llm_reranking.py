@@ -16,6 +16,7 @@ export OPENROUTER_API_KEY='your-api-key-here'
 """
 
 import argparse
+import asyncio
 import os
 
 from src.components import file_utils
@@ -28,10 +29,32 @@ RETRIEVAL_RESULTS_PATH = "data/retrieval_results/bm25.trec"
 OUTPUT_FILE = "data/retrieval_results/reranked_results.trec"
 LLM_MODEL_NAME = "openrouter/meta-llama/llama-4-maverick-17b-128e-instruct:free"
 SLIDING_K = 10  # Number of sliding window passes for reranking
+MAX_CONCURRENCY = 4  # Maximum number of concurrent LLM requests
+MAX_DOC_TOKENS = 256  # Documents are truncated to about this many tokens
 QUERY_LIMIT = 0  # Set to 0 to process all queries
 
 
-def main(args):
+async def rerank_author(
+    reranker, trec_writer, author_id, nl_profile, initial_rankedlist, args
+):
+    """Reranks and saves the results for a single author."""
+    print(f"\n--- Reranking for author: {author_id} ---")
+    print(f"Query: {nl_profile[:200]}...")
+
+    doc_ids = [doc_id for doc_id, _ in initial_rankedlist]
+    doc_ids_to_contents = await file_utils.load_document_contents_async(
+        args.docs_base_path, author_id, set(doc_ids)
+    )
+
+    reranked_rankedlist = await reranker.rerank_async(
+        author_id, nl_profile, initial_rankedlist, doc_ids_to_contents
+    )
+
+    trec_writer.write(author_id, reranked_rankedlist)
+    print(f"Successfully reranked and saved results for {author_id}.")
+
+
+async def main(args):
     """
     Main pipeline to load data, rerank documents, and save the results.
     Accepts command-line arguments for all configurations.
@@ -47,42 +70,53 @@ def main(args):
     initial_rankings = file_utils.parse_trec_file(args.retrieval_results_path)
 
     # 2. Initialize the reranker model using params from args
-    reranker = PRPReranker(llm_model_name=args.llm_model_name, sliding_k=args.sliding_k)
+    reranker = PRPReranker(
+        llm_model_name=args.llm_model_name,
+        sliding_k=args.sliding_k,
+        max_concurrency=args.max_concurrency,
+        strategy=args.strategy,
+        cache_path=args.cache_path,
+        max_doc_tokens=args.max_doc_tokens or None,
+    )
 
-    # 3. Process each query
-    queries_processed = 0
+    # 3. Select the queries to process
+    queries = []
     for author_id, initial_rankedlist in initial_rankings.items():
         if author_id not in nl_profiles.keys():
             print(f"Warning: No query found for author_id {author_id}. Skipping.")
             continue
-
-        nl_profile = nl_profiles[author_id]
-        print(f"\n--- Reranking for author: {author_id} ---")
-        print(f"Query: {nl_profile[:200]}...")
-
-        doc_ids = [doc_id for doc_id, _ in initial_rankedlist]
-        doc_ids_to_contents = file_utils.load_document_contents(
-            args.docs_base_path, author_id, set(doc_ids)
-        )
-
-        reranked_rankedlist = reranker.rerank(
-            author_id, nl_profile, initial_rankedlist, doc_ids_to_contents
-        )
-
-        file_utils.write_trec_results(
-            output_path=args.output_file,
-            query_id=author_id,
-            ranked_doc_ids=reranked_rankedlist,
-            run_id="llm_rerank",
-        )
-        print(f"Successfully reranked and saved results for {author_id}.")
-
-        queries_processed += 1
+        queries.append((author_id, nl_profiles[author_id], initial_rankedlist))
         # Check against the query limit from args
-        if args.query_limit > 0 and queries_processed >= args.query_limit:
+        if args.query_limit > 0 and len(queries) >= args.query_limit:
             print(f"\nReached query limit of {args.query_limit}. Halting.")
             break
 
+    # 4. Rerank the queries concurrently; the reranker bounds the number of
+    # LLM requests in flight
+    try:
+        with file_utils.TrecWriter(args.output_file, "llm_rerank") as trec_writer:
+            await asyncio.gather(
+                *(
+                    rerank_author(
+                        reranker,
+                        trec_writer,
+                        author_id,
+                        nl_profile,
+                        initial_rankedlist,
+                        args,
+                    )
+                    for author_id, nl_profile, initial_rankedlist in queries
+                )
+            )
+    finally:
+        reranker.close()
+        if reranker.num_failed_comparisons:
+            print(
+                f"WARNING: {reranker.num_failed_comparisons} LLM comparisons failed"
+                " and kept the documents in their current order. Consider lowering"
+                " --max_concurrency."
+            )
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
@@ -132,6 +166,35 @@ if __name__ == "__main__":
         help="Number of sliding window passes to perform for reranking.",
     )
 
+    parser.add_argument(
+        "--strategy",
+        choices=["sliding", "tournament"],
+        default="sliding",
+        help=(
+            "Sliding window passes, or tournament selection of the top "
+            "sliding_k documents with fewer LLM calls."
+        ),
+    )
+    parser.add_argument(
+        "--max_concurrency",
+        type=int,
+        default=MAX_CONCURRENCY,
+        help="Maximum number of LLM requests in flight across all queries.",
+    )
+
+    parser.add_argument(
+        "--max_doc_tokens",
+        type=int,
+        default=MAX_DOC_TOKENS,
+        help="Approximate token budget per document in prompts; 0 disables.",
+    )
+    parser.add_argument(
+        "--cache_path",
+        type=str,
+        default=None,
+        help="Optional SQLite file for reusing LLM answers across runs.",
+    )
+
     # --- Execution Control Arguments ---
     parser.add_argument(
         "--query_limit",
@@ -141,4 +204,4 @@ if __name__ == "__main__":
     )
 
     args = parser.parse_args()
-    main(args)
+    asyncio.run(main(args))
@@ -1,17 +1,15 @@
 """Sample users and save their data, including the NL profile input and ground
 truth items."""
 
-import ast
-
 import pandas as pd
 
 from src.components.article import Article, ReferencedArticles
 from src.components.author import Author
 
 # Constants for file paths
-CANDIDATE_USERS_CSV_PATH = "data/preprocessed/candidate_users.csv"
-METADATA_CSV_PATH = "data/preprocessed/arxiv-metadata.csv"
-CITATIONS_CSV_PATH = "data/preprocessed/citations.csv"
+CANDIDATE_USERS_PARQUET_PATH = "data/preprocessed/candidate_users.parquet"
+METADATA_PARQUET_PATH = "data/preprocessed/arxiv-metadata.parquet"
+CITATIONS_PARQUET_PATH = "data/preprocessed/citations.parquet"
 SAMPLED_USERS_JSONL_PATH = "data/SciNUP/sampled_users.jsonl"
 # Number of sample users to select
 N_SAMPLE_USERS = 1050
@@ -23,14 +21,15 @@ SEED = 42
 
 
 def sample_users(
-    metadata: pd.DataFrame, authors: pd.DataFrame, citations: pd.DataFrame
+    metadata: pd.DataFrame, authors: pd.DataFrame, refs_map: dict[str, list[str]]
 ) -> list[Author]:
     """Takes a random sample of users and transforms it into a list of Author.
 
     Args:
         metadata: DataFrame containing paper metadata.
         authors: DataFrame containing candidate authors and their papers.
-        citations: DataFrame containing citation information.
+        refs_map: Mapping from article IDs to their unique referenced article
+          IDs.
 
     Returns:
         List of Author objects.
@@ -42,30 +41,36 @@ def sample_users(
         & (authors["num_papers"] <= N_MAX_PAPERS)
     ].sample(N_SAMPLE_USERS, random_state=SEED)
     print("Dataset sampled")
+    # Index metadata once so that per-user lookups use the hashed index
+    meta_by_id = metadata.set_index("article_id", drop=False).sort_index()
     counter = 0
     for i, row in sample.iterrows():
         author_id = row["author_id"]
-        author_name = row["author_name"]
-        article_ids = row["authored_papers"]
+        # Author name variants are stored as a list
+        author_name = ", ".join(row["author_name"])
+        article_ids = row["authored_paper_ids"]
         n_articles = row["num_papers"]
 
         if len(author_name.split(", ")) >= 10:
             continue
 
-        authored_articles_df = metadata[metadata.article_id.isin(article_ids)]
+        authored_articles_df = meta_by_id.loc[
+            meta_by_id.index.intersection(article_ids)
+        ]
         authored_articles_df = authored_articles_df.sort_values(
             by="update_date"
         ).reset_index(drop=True)
 
         user_profile_input = df_to_articles(authored_articles_df[: n_articles // 2])
 
-        seen_article_ids = get_referenced_articles_set(user_profile_input, citations)
+        seen_article_ids = get_referenced_articles_set(user_profile_input, refs_map)
         ground_truth_ids = get_referenced_articles_set(
-            df_to_articles(authored_articles_df[n_articles // 2 :]), citations
+            df_to_articles(authored_articles_df[n_articles // 2 :]), refs_map
         )
-        ground_truth_ids = list(set(ground_truth_ids).difference(set(seen_article_ids)))
+        # Both ID lists are already unique
+        ground_truth_ids = pd.Index(ground_truth_ids).difference(seen_article_ids)
         ground_truth = df_to_articles(
-            metadata[metadata.article_id.isin(ground_truth_ids)]
+            meta_by_id.loc[meta_by_id.index.intersection(ground_truth_ids)]
         )
 
         users.append(Author(author_id, author_name, user_profile_input, ground_truth))
@@ -89,88 +94,96 @@ def df_to_articles(articles_df: pd.DataFrame) -> list[Article]:
     Returns:
         List of Article objects.
     """
-    articles = []
-    for i, article in articles_df.iterrows():
-        articles.append(
-            Article(
-                article_id=article["article_id"],
-                title=article["title"],
-                author_names=[" ".join(name) for name in article["authors_parsed"]],
-                abstract=article["abstract"],
-                categories=article["categories"],
-                update_date=article["update_date"],
-            )
+    # Iterate over whole columns rather than boxing every row into a Series.
+    # update_date is taken via to_list() to keep pd.Timestamp values.
+    columns = (
+        articles_df.article_id.to_numpy(),
+        articles_df.title.to_numpy(),
+        articles_df.authors_parsed.to_list(),
+        articles_df.abstract.to_numpy(),
+        articles_df.categories.to_numpy(),
+        articles_df.update_date.to_list(),
+    )
+    return [
+        Article(
+            article_id=article_id,
+            title=title,
+            author_names=[" ".join(name) for name in authors_parsed],
+            abstract=abstract,
+            categories=categories,
+            update_date=update_date,
         )
-    return articles
+        for (
+            article_id,
+            title,
+            authors_parsed,
+            abstract,
+            categories,
+            update_date,
+        ) in zip(*columns)
+    ]
 
 
 def _get_referenced_articles(
-    article: Article, citations: pd.DataFrame
+    article: Article, refs_map: dict[str, list[str]]
 ) -> ReferencedArticles:
     """Extracts the list of referenced articles for a given article.
 
     Args:
         article: Article object to find references for.
-        citations: DataFrame containing citation information.
+        refs_map: Mapping from article IDs to their unique referenced article
+          IDs.
 
     Returns:
         ReferencedArticles object containing unique referenced paper IDs.
     """
-    article_id = article.article_id
-    if article_id not in citations.article_id.values:
-        return ReferencedArticles(article.article_id, [])
-
-    refs = citations[citations.article_id == article_id]["references"].values[0]
-    return ReferencedArticles(article_id, list(set(refs)))
+    return ReferencedArticles(article.article_id, refs_map.get(article.article_id, []))
 
 
 def get_referenced_articles_set(
-    articles: list[Article], citations: pd.DataFrame
+    articles: list[Article], refs_map: dict[str, list[str]]
 ) -> list[str]:
     """Extracts the list of unique referenced article IDs for a list of articles.
 
     Args:
         articles: List of Article objects to find references for.
-        citations: DataFrame containing citation information.
+        refs_map: Mapping from article IDs to their unique referenced article
+          IDs.
 
     Returns:
         List of unique referenced article IDs.
     """
     refs = []
     for article in articles:
-        refs.extend(_get_referenced_articles(article, citations).referenced_article_ids)
+        refs.extend(_get_referenced_articles(article, refs_map).referenced_article_ids)
     return list(set(refs))
 
 
 def main():
-    metadata = pd.read_csv(
-        METADATA_CSV_PATH,
-        dtype={"article_id": "string"},
-        converters={"authors_parsed": ast.literal_eval},
-        parse_dates=["update_date"],
-    )
+    metadata = pd.read_parquet(METADATA_PARQUET_PATH)
     print("metadata read")
-    authors = pd.read_csv(
-        CANDIDATE_USERS_CSV_PATH,
-        dtype={"author_name": "string", "num_papers": "int"},
-        converters={
-            "authored_papers": ast.literal_eval,
-            "categories": ast.literal_eval,
-        },
-    )
+    authors = pd.read_parquet(CANDIDATE_USERS_PARQUET_PATH)
     print("authors dataset read")
-    citations = pd.read_csv(
-        CITATIONS_CSV_PATH,
-        dtype={"article_id": "string", "num_references": "int"},
-        converters={"references": ast.literal_eval},
-    )
+    citations = pd.read_parquet(CITATIONS_PARQUET_PATH)
     print("citations dataset read")
-    users = sample_users(metadata, authors, citations)
+    # References are deduplicated once here rather than on every lookup
+    refs_map = {
+        article_id: list(set(references))
+        for article_id, references in zip(
+            citations["article_id"], citations["references"]
+        )
+    }
+    users = sample_users(metadata, authors, refs_map)
     print(f"Number of users: {len(users)}")
 
-    with open(SAMPLED_USERS_JSONL_PATH, "w") as file:
+    with open(SAMPLED_USERS_JSONL_PATH, "wb", buffering=1 << 20) as file:
         for author in users:
-            file.write(author.to_json() + "\n")
+            # Candidate items and NL profiles are only added in generate_dataset
+            file.write(
+                author.to_jsonl_bytes(
+                    ["author_name", "nl_profile_input", "ground_truth_items"]
+                )
+            )
 
     print(f"Sample users saved to {SAMPLED_USERS_JSONL_PATH}")
 
@@ -1,12 +1,13 @@
 """Representations of articles (research papers) and references."""
 
-import json
-from dataclasses import asdict, dataclass
+from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional
 
+import orjson
 
-@dataclass
+
+@dataclass(slots=True)
 class Article:
     """Represents an article."""
 
@@ -19,13 +20,10 @@ class Article:
     author_ids: Optional[list[str]] = (
         None  # Only set if author names are resolved to IDs
     )
-    abstract: str
-    categories: list[str]
-    update_date: datetime
 
     def to_json(self) -> str:
         """Converts the article data to a JSON-formatted string."""
-        return json.dumps(
+        return orjson.dumps(
             {
                 "article_id": self.article_id,
                 "title": self.title,
@@ -35,15 +33,21 @@ class Article:
                 "categories": self.categories,
                 "update_date": self.update_date.isoformat(),
             },
-            indent=4,
-        )
+            option=orjson.OPT_INDENT_2,
+        ).decode()
 
     def to_dict(self) -> dict:
         """Converts the article object into a dictionary with a JSON-friendly
         format."""
-        data = asdict(self)
-        data["update_date"] = self.update_date.isoformat()
-        return data
+        return {
+            "article_id": self.article_id,
+            "title": self.title,
+            "abstract": self.abstract,
+            "categories": self.categories,
+            "update_date": self.update_date.isoformat(),
+            "author_names": self.author_names,
+            "author_ids": self.author_ids,
+        }
 
 
 @dataclass
@@ -1,9 +1,11 @@
 """Representation of data associated with an author."""
 
-import json
 from dataclasses import dataclass
+from datetime import datetime
 from typing import Optional
 
+import orjson
+
 from src.components.article import Article
 
 
@@ -37,17 +39,39 @@ class Author:
         ],
     ) -> str:
         """Converts the author data to a JSON-formatted string."""
-        author_json = {"author_id": self.author_id}
-        for attr in attr_list:
-            if attr in [
-                "nl_profile_input",
-                "ground_truth_items",
-                "candidate_items",
-            ]:
-                author_json[attr] = [
-                    article.to_dict() for article in getattr(self, attr)
-                ]
-            else:
-                author_json[attr] = getattr(self, attr)
-
-        return json.dumps(author_json)
+        return orjson.dumps(
+            self._to_json_dict(attr_list), default=_json_default
+        ).decode()
+
+    def to_jsonl_bytes(
+        self,
+        attr_list: list[str] = [
+            "nl_profile_input",
+            "ground_truth_items",
+            "nl_profile",
+            "candidate_items",
+        ],
+    ) -> bytes:
+        """Converts the author data to a newline-terminated UTF-8 JSON line."""
+        return orjson.dumps(
+            self._to_json_dict(attr_list),
+            default=_json_default,
+            option=orjson.OPT_APPEND_NEWLINE,
+        )
+
+    def _to_json_dict(self, attr_list: list[str]) -> dict:
+        """Returns the author ID and the given attributes as a dictionary.
+
+        Articles are kept as dataclasses, which orjson serializes natively.
+        """
+        return {
+            "author_id": self.author_id,
+            **{attr: getattr(self, attr) for attr in attr_list},
+        }
+
+
+def _json_default(obj):
+    """Serializes objects orjson does not support natively (pd.Timestamp)."""
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
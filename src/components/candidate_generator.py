@@ -1,9 +1,14 @@
 """CandidateGenerator class for generating candidate items for a user."""
 
+from collections import Counter
+from itertools import chain
+from operator import attrgetter
+from typing import Union
+
 import numpy as np
 import pandas as pd
 
-from scripts.sample_users import df_to_articles, get_referenced_articles_set
+from scripts.sample_users import df_to_articles
 from src.components.article import Article
 from src.components.author import Author
 
@@ -25,8 +30,30 @@ class CandidateGenerator:
             metadata: DataFrame containing paper metadata.
             citations: DataFrame containing citation information.
         """
-        self._metadata = metadata
-        self._citations = citations
+        # Indexed by article ID so rows are looked up via the hashed index
+        self._metadata = metadata.set_index("article_id", drop=False)
+        # Referenced article IDs per citing article
+        self._references: dict[str, set[str]] = dict(
+            zip(citations.article_id, citations.references.map(set))
+        )
+
+        # Article IDs per (single) category, computed once for all authors
+        categories_df = metadata[["article_id"]].assign(
+            categories=metadata.categories.map(_split_categories)
+        )
+        self._category_to_ids: dict[str, np.ndarray] = {
+            category: ids.drop_duplicates().to_numpy(dtype=object)
+            for category, ids in categories_df.explode("categories").groupby(
+                "categories"
+            )["article_id"]
+        }
+        self._all_ids = metadata.article_id.unique().astype(object)
+        # Position of each article ID in _all_ids, to mask out excluded IDs
+        self._id_to_position: dict[str, int] = {
+            article_id: position for position, article_id in enumerate(self._all_ids)
+        }
+        # Articles built so far, shared across authors
+        self._article_cache: dict[str, Article] = {}
 
     def generate_candidates(self, author: Author) -> list[Article]:
         """Generates candidate items for the user.
@@ -42,19 +69,22 @@ class CandidateGenerator:
             List of candidate items for the user.
         """
         profile_input_articles = author.nl_profile_input
-        seen_article_ids = get_referenced_articles_set(
-            profile_input_articles, self._citations
-        )
+        seen_article_ids = set()
+        for article in profile_input_articles:
+            seen_article_ids.update(self._references.get(article.article_id, ()))
 
         ground_truth_articles = author.ground_truth_items
         print("num_ground_truth_articles: ", len(ground_truth_articles))
-        authored_categories = np.concatenate(
-            [article.categories for article in profile_input_articles],
-            axis=None,
+        authored_categories = list(
+            chain.from_iterable(
+                _split_categories(article.categories)
+                for article in profile_input_articles
+            )
         )
+        category_counts = Counter(authored_categories)
         categories = {
-            item: authored_categories.tolist().count(item) / len(authored_categories)
-            for item in set(authored_categories)
+            item: count / len(authored_categories)
+            for item, count in category_counts.items()
         }
 
         candidate_items = self._n_plus_random(
@@ -68,7 +98,7 @@ class CandidateGenerator:
     def _n_plus_random(
         self,
         categories: dict[str, float],
-        seen_article_ids: list[str] = [],
+        seen_article_ids: set[str] = set(),
         ground_truth_articles: list[Article] = [],
         num_candidates: int = NUM_CANDIDATES,
     ) -> list[Article]:
@@ -80,7 +110,7 @@ class CandidateGenerator:
         Args:
             categories: Dictionary of categories with their weights.
             num_candidates: Number of candidates items.
-            seen_article_ids: List of article IDs that have been seen by the user.
+            seen_article_ids: Set of article IDs that have been seen by the user.
             ground_truth_articles: List of ground truth articles for the user.
 
         Returns:
@@ -88,7 +118,8 @@ class CandidateGenerator:
         """
         candidate_items = []
         candidate_items.extend(ground_truth_articles)
-        filtered_df = self._metadata[~self._metadata.article_id.isin(seen_article_ids)]
+        excluded_ids = np.array(list(seen_article_ids), dtype=object)
+        rng = np.random.default_rng(SEED)
         num_to_sample = num_candidates - len(candidate_items)
         if num_to_sample < 0:
             print(
@@ -96,33 +127,112 @@ class CandidateGenerator:
                 f" {len(candidate_items)}"
             )
 
-        for category, weight in categories.items():
-            cat_df = filtered_df[
-                filtered_df.categories.astype(str).str.contains(category)
-            ]
-            n = int(num_to_sample * weight)
+        # Split the number of items to sample across categories in one draw
+        weights = np.array(list(categories.values()), dtype=float)
+        if not categories or weights.sum() == 0:
+            # Nothing to sample per category; the fallbacks below fill the list
+            category_counts = np.zeros(len(weights), dtype=int)
+        else:
+            category_counts = rng.multinomial(
+                max(num_to_sample, 0), weights / weights.sum()
+            )
+        for category, n in zip(categories, category_counts):
             if n == 0:
                 continue
-
-            sample = cat_df.sample(n, random_state=SEED) if len(cat_df) >= n else cat_df
-            candidate_items.extend(df_to_articles(sample))
-
-            filtered_df = filtered_df[~filtered_df.article_id.isin(sample.article_id)]
+            allowed_ids = np.setdiff1d(
+                self._category_to_ids.get(category, np.array([], dtype=object)),
+                excluded_ids,
+            )
+            sample_ids = self._sample_ids(rng, allowed_ids, n)
+            candidate_items.extend(self._get_articles(sample_ids))
+            excluded_ids = np.concatenate([excluded_ids, sample_ids])
 
         if len(candidate_items) < num_candidates:
             print(
                 "Sampling from all the categories to get enough number of " "candidates"
             )
-            cat_df = filtered_df[
-                filtered_df.categories.astype(str).str.contains("|".join(categories))
+            category_ids = [
+                self._category_to_ids[category]
+                for category in categories
+                if category in self._category_to_ids
             ]
+            allowed_ids = np.setdiff1d(
+                np.concatenate(category_ids) if category_ids else [], excluded_ids
+            )
             n = num_candidates - len(candidate_items)
-            sample = cat_df.sample(n, random_state=SEED) if len(cat_df) >= n else cat_df
-            candidate_items.extend(df_to_articles(sample))
+            sample_ids = self._sample_ids(rng, allowed_ids, n)
+            candidate_items.extend(self._get_articles(sample_ids))
+            excluded_ids = np.concatenate([excluded_ids, sample_ids])
 
         if len(candidate_items) < num_candidates:
             print("Sampling from the dataset without category filtering")
-            sample = filtered_df.sample(num_candidates - len(candidate_items))
-            candidate_items.extend(df_to_articles(sample))
+            allowed = np.ones(len(self._all_ids), dtype=bool)
+            allowed[
+                [
+                    self._id_to_position[article_id]
+                    for article_id in excluded_ids
+                    if article_id in self._id_to_position
+                ]
+            ] = False
+            allowed_ids = self._all_ids[allowed]
+            n = num_candidates - len(candidate_items)
+            sample_ids = self._sample_ids(rng, allowed_ids, n)
+            candidate_items.extend(self._get_articles(sample_ids))
+
+        candidate_items.sort(key=attrgetter("article_id"))
+        return candidate_items
+
+    @staticmethod
+    def _sample_ids(
+        rng: np.random.Generator, article_ids: np.ndarray, n: int
+    ) -> np.ndarray:
+        """Samples n article IDs without replacement, or all if fewer exist.
+
+        Args:
+            rng: Random number generator.
+            article_ids: Array of article IDs to sample from.
+            n: Number of article IDs to sample.
+
+        Returns:
+            Array of sampled article IDs.
+        """
+        if len(article_ids) <= n:
+            return article_ids
+        return rng.choice(article_ids, size=n, replace=False)
 
-        return sorted(candidate_items, key=lambda article: article.article_id)
+    def _get_articles(self, article_ids: np.ndarray) -> list[Article]:
+        """Returns articles for the given IDs, building uncached ones from the
+        metadata.
+
+        Args:
+            article_ids: Array of article IDs.
+
+        Returns:
+            List of Article objects.
+        """
+        missing_ids = [
+            article_id
+            for article_id in article_ids
+            if article_id not in self._article_cache
+        ]
+        if missing_ids:
+            for article in df_to_articles(self._metadata.loc[missing_ids]):
+                self._article_cache[article.article_id] = article
+        return [self._article_cache[article_id] for article_id in article_ids]
+
+
+def _split_categories(categories: Union[str, list[str]]) -> list[str]:
+    """Returns article categories as a list.
+
+    The arXiv metadata stores categories as a single space-separated string,
+    e.g., "cs.IR cs.CL".
+
+    Args:
+        categories: Categories as a string or a list of strings.
+
+    Returns:
+        List of categories.
+    """
+    if isinstance(categories, str):
+        return categories.split()
+    return list(categories)
@@ -1,9 +1,11 @@
 """Utility functions for file operations, such as reading and writing different
 format files."""
 
-import json
+import asyncio
 from collections import defaultdict
 
+import simdjson
+
 from src.models.retriever import RankedList
 
 
@@ -19,9 +21,11 @@ def parse_trec_file(file_path: str) -> dict[str, RankedList]:
         (document ID, score) tuples.
     """
     trec_data = defaultdict(list)
-    with open(file_path, "r", encoding="utf-8") as f:
+    with open(file_path, "r", encoding="utf-8", buffering=1 << 20) as f:
         for line in f:
-            query_id, _, doc_id, _, score, _ = line.strip().split()
+            # split() skips surrounding whitespace, so no strip() is needed;
+            # the run ID is left unsplit
+            query_id, _, doc_id, _, score, _ = line.split(None, 5)
             trec_data[query_id].append((doc_id, float(score)))
     return trec_data
 
@@ -41,24 +45,52 @@ def load_document_contents(
     """
     doc_ids_to_contents = {}
     jsonl_path = f"{base_path}/{author_id}/docs.jsonl"
+    # Reused for all lines; only the accessed fields become Python objects
+    parser = simdjson.Parser()
 
-    with open(jsonl_path, "r", encoding="utf-8") as f:
+    with open(jsonl_path, "rb") as f:
         for line in f:
-            doc = json.loads(line)
-            if doc["id"] not in selected_doc_ids:
-                continue
-            doc_ids_to_contents[doc["id"]] = doc["contents"]
+            doc = parser.parse(line)
+            doc_id = doc.at_pointer("/id")
+            if doc_id in selected_doc_ids:
+                doc_ids_to_contents[doc_id] = doc.at_pointer("/contents")
+            # The parser can only be reused once no document proxy refers to it
+            del doc
 
     return doc_ids_to_contents
 
 
+async def load_document_contents_async(
+    base_path: str, author_id: str, selected_doc_ids: frozenset[str]
+) -> dict[str, str]:
+    """Asynchronous counterpart of `load_document_contents`.
+
+    The file is read in a worker thread, so the event loop keeps running.
+
+    Args:
+        base_path: Base directory where author folders are located.
+        author_id: The author ID whose documents to load.
+        selected_doc_ids: A set of document IDs to load.
+
+    Returns:
+        A dictionary mapping doc_id to its text content.
+    """
+    return await asyncio.to_thread(
+        load_document_contents, base_path, author_id, selected_doc_ids
+    )
+
+
 def load_nl_profiles(dataset_path: str) -> dict[str, str]:
     """Load author_id -> nl_profile (query) from dataset.jsonl."""
     queries = {}
-    with open(dataset_path, "r", encoding="utf-8") as f:
+    # Records also hold the candidate items, which are never materialized
+    parser = simdjson.Parser()
+    with open(dataset_path, "rb") as f:
         for line in f:
-            data = json.loads(line)
-            queries[data["author_id"]] = data["nl_profile"]
+            data = parser.parse(line)
+            queries[data.at_pointer("/author_id")] = data.at_pointer("/nl_profile")
+            # The parser can only be reused once no document proxy refers to it
+            del data
     return queries
 
 
@@ -69,6 +101,43 @@ def write_trec_results(
     run_id: str,
 ):
     """Writes results in TREC format, appending to the file."""
-    with open(output_path, "a") as f:
-        for rank, (doc_id, score) in enumerate(ranked_doc_ids, start=1):
-            f.write(f"{query_id} Q0 {doc_id} {rank} {score} {run_id}\n")
+    with TrecWriter(output_path, run_id) as writer:
+        writer.write(query_id, ranked_doc_ids)
+
+
+class TrecWriter:
+    """Appends results in TREC format to a file that is kept open."""
+
+    def __init__(self, output_path: str, run_id: str):
+        """Opens the output file for appending.
+
+        Args:
+            output_path: Path to the TREC results file.
+            run_id: Run identifier written in the last column.
+        """
+        self._file = open(output_path, "ab", buffering=1 << 20)
+        self._run_id = run_id
+
+    def write(self, query_id: str, ranked_doc_ids: RankedList) -> None:
+        """Writes the ranked list of a query with a single write call.
+
+        Args:
+            query_id: The query ID.
+            ranked_doc_ids: Ranked list of (document ID, score) tuples.
+        """
+        self._file.write(
+            "".join(
+                f"{query_id} Q0 {doc_id} {rank} {score} {self._run_id}\n"
+                for rank, (doc_id, score) in enumerate(ranked_doc_ids, start=1)
+            ).encode()
+        )
+
+    def close(self) -> None:
+        """Flushes and closes the output file."""
+        self._file.close()
+
+    def __enter__(self) -> "TrecWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -9,7 +9,7 @@ import os
 from typing import Optional
 
 import litellm
-from ollama import Client
+from ollama import AsyncClient, Client
 
 OLLAMA_HOST = "https://ollama.ux.uis.no"
 
@@ -46,43 +46,100 @@ def call_llm(
     if backend == "ollama":
         try:
             client = Client(host=OLLAMA_HOST)
-            final_prompt = f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
             response = client.generate(
                 model=model,
-                prompt=final_prompt,
+                prompt=_ollama_prompt(prompt, system_prompt),
             )
             return response["response"].strip()
         except Exception as e:
             print(f"An error occurred while calling Ollama: {e}")
             return ""
     elif backend == "openrouter":
-        api_key = os.getenv("OPENROUTER_API_KEY")
-        if not api_key:
-            raise ValueError("OPENROUTER_API_KEY environment variable not set.")
+        completion_kwargs = _openrouter_kwargs(
+            prompt, model, system_prompt, max_tokens, api_base, temperature
+        )
+        try:
+            response = litellm.completion(**completion_kwargs)
+            return _response_text(response)
+        except Exception as e:
+            print(f"An error occurred while calling the LLM: {e}")
+            return ""
 
-        messages = []
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        messages.append({"role": "user", "content": prompt})
 
+async def call_llm_async(
+    prompt: str,
+    model: str,
+    backend: str = "openrouter",
+    system_prompt: Optional[str] = None,
+    max_tokens: Optional[int] = None,
+    api_base: str = "https://openrouter.ai/api/v1",
+    temperature: float = 0,
+) -> str:
+    """Asynchronous counterpart of `call_llm`, allowing concurrent requests."""
+    if backend == "ollama":
         try:
-            response = litellm.completion(
+            client = AsyncClient(host=OLLAMA_HOST)
+            response = await client.generate(
                 model=model,
-                api_key=api_key,
-                api_base=api_base,
-                messages=messages,
-                max_tokens=max_tokens,
-                temperature=temperature,
+                prompt=_ollama_prompt(prompt, system_prompt),
             )
-
-            response_text = response.choices[0].message.content.strip()
-            return response_text
-
+            return response["response"].strip()
+        except Exception as e:
+            print(f"An error occurred while calling Ollama: {e}")
+            return ""
+    elif backend == "openrouter":
+        completion_kwargs = _openrouter_kwargs(
+            prompt, model, system_prompt, max_tokens, api_base, temperature
+        )
+        try:
+            response = await litellm.acompletion(**completion_kwargs)
+            return _response_text(response)
         except Exception as e:
             print(f"An error occurred while calling the LLM: {e}")
             return ""
 
 
+def _ollama_prompt(prompt: str, system_prompt: Optional[str]) -> str:
+    """Prepends the optional system prompt, as Ollama takes a single prompt."""
+    return f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
+
+
+def _openrouter_kwargs(
+    prompt: str,
+    model: str,
+    system_prompt: Optional[str],
+    max_tokens: Optional[int],
+    api_base: str,
+    temperature: float,
+) -> dict:
+    """Builds the litellm completion arguments for an OpenRouter request.
+
+    Raises:
+        ValueError: If the OPENROUTER_API_KEY environment variable is not set.
+    """
+    api_key = os.getenv("OPENROUTER_API_KEY")
+    if not api_key:
+        raise ValueError("OPENROUTER_API_KEY environment variable not set.")
+
+    messages = []
+    if system_prompt:
+        messages.append({"role": "system", "content": system_prompt})
+    messages.append({"role": "user", "content": prompt})
+    return {
+        "model": model,
+        "api_key": api_key,
+        "api_base": api_base,
+        "messages": messages,
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+    }
+
+
+def _response_text(response) -> str:
+    """Extracts the stripped content of a litellm completion response."""
+    return response.choices[0].message.content.strip()
+
+
 def get_last_response_line(response: str) -> str:
     """Extracts the last non-empty line from the LLM response."""
     lines = [line.strip() for line in response.strip().split("\n") if line.strip()]
@@ -1,13 +1,20 @@
 """Class for natural language profile-based dense retrieval."""
 
 import os
+from functools import lru_cache
+from typing import Optional
 
+import numpy as np
 from pyserini.encode import AutoQueryEncoder, TctColBertQueryEncoder
 from pyserini.search.faiss import FaissSearcher
 
 from src.models.retriever import RankedList, Retriever
 
 SCIBERT_ENCODER = "allenai/scibert_scivocab_uncased"
+# Number of per-author searchers kept open
+SEARCHER_CACHE_SIZE = 128
+# Number of encoded NL profiles kept in memory
+QUERY_CACHE_SIZE = 4096
 
 
 class DenseRetriever(Retriever):
@@ -17,24 +24,94 @@ class DenseRetriever(Retriever):
         self,
         index_root: str,
         encoder_model: str = SCIBERT_ENCODER,
+        searcher_cache_size: int = SEARCHER_CACHE_SIZE,
+        query_cache_size: int = QUERY_CACHE_SIZE,
     ):
         self._index_root = index_root
         if "bert" in encoder_model.lower():
             self._encoder = TctColBertQueryEncoder(encoder_model)
         else:
             self._encoder = AutoQueryEncoder(encoder_model)
+        # Opened indexes are reused across queries for the same author
+        self._get_searcher = lru_cache(maxsize=searcher_cache_size)(self._open_searcher)
+        # The same NL profile is encoded only once for all authors' indexes
+        self._encode_query = lru_cache(maxsize=query_cache_size)(self._encode)
+
+    def _open_searcher(self, author_id: str) -> FaissSearcher:
+        """Opens the FAISS index of an author."""
+        return FaissSearcher(os.path.join(self._index_root, author_id), self._encoder)
+
+    def _encode(self, nl_profile: str) -> np.ndarray:
+        """Encodes an NL profile with the query encoder."""
+        return np.asarray(self._encoder.encode(nl_profile), dtype=np.float32)
+
+    def encode_query(self, nl_profile: str) -> np.ndarray:
+        """Returns the (cached) embedding of an NL profile.
+
+        Args:
+            nl_profile: NL profile used as query.
+
+        Returns:
+            The query embedding as a 1-D float32 array.
+        """
+        return self._encode_query(nl_profile)
+
+    def clear_cache(self) -> None:
+        """Releases all cached searchers and drops cached query embeddings."""
+        self._get_searcher.cache_clear()
+        self._encode_query.cache_clear()
 
     def score(
         self,
         author_id: str,
         nl_profile: str,
         top_k: int = 100,
+        query_vec: Optional[np.ndarray] = None,
     ) -> RankedList:
+        """Retrieves documents from the index of an author.
+
+        Args:
+            author_id: The author ID whose index is searched.
+            nl_profile: NL profile used as query.
+            top_k: Number of documents to retrieve.
+            query_vec: Optional precomputed embedding of the NL profile. If not
+              given, the cached embedding from `encode_query` is used.
+
+        Returns:
+            Ranked list of (document ID, score) tuples.
+        """
         index_dir = os.path.join(self._index_root, author_id)
         if not os.path.exists(index_dir):
             print(f"[WARN] Index for {author_id} not found, skipping...")
             return []
 
-        searcher = FaissSearcher(index_dir, self._encoder)
-        hits = searcher.search(nl_profile, k=top_k)
+        if query_vec is None:
+            query_vec = self.encode_query(nl_profile)
+        searcher = self._get_searcher(author_id)
+        # Searching with an embedding skips the encoder inside FaissSearcher
+        hits = searcher.search(query_vec.reshape(1, -1), k=top_k)
         return [(hit.docid, float(hit.score)) for hit in hits]
+
+    def batch_score(
+        self,
+        author_id: str,
+        nl_profiles: dict[str, str],
+        top_k: int = 100,
+    ) -> dict[str, RankedList]:
+        index_dir = os.path.join(self._index_root, author_id)
+        if not os.path.exists(index_dir):
+            print(f"[WARN] Index for {author_id} not found, skipping...")
+            return {query_id: [] for query_id in nl_profiles}
+
+        # All profiles are searched with a single FAISS call
+        searcher = self._get_searcher(author_id)
+        hits = searcher.batch_search(
+            np.stack([self.encode_query(profile) for profile in nl_profiles.values()]),
+            list(nl_profiles.keys()),
+            k=top_k,
+            threads=os.cpu_count(),
+        )
+        return {
+            query_id: [(hit.docid, float(hit.score)) for hit in query_hits]
+            for query_id, query_hits in hits.items()
+        }
@@ -5,6 +5,13 @@ Qin et al. Large Language Models are Effective Text Rankers with Pairwise Rankin
 Prompting, NAACL Findings 2024 (https://aclanthology.org/2024.findings-naacl.97/)
 """
 
+import asyncio
+import hashlib
+import sqlite3
+import string
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
 from src.components import llm_utils
 from src.models.reranker import Reranker
 from src.models.retriever import RankedList
@@ -18,6 +25,14 @@ _PROMPT = (
     "Document B: {docB}\n\n"
     "Answer (A or B):"
 )
+# _PROMPT split once around its {query}, {docA} and {docB} placeholders
+_PROMPT_PREFIX, _PROMPT_BEFORE_DOC_A, _PROMPT_BEFORE_DOC_B, _PROMPT_SUFFIX = (
+    literal for literal, _, _, _ in string.Formatter().parse(_PROMPT)
+)
+# Rough number of characters per token, used to truncate documents
+_CHARS_PER_TOKEN = 4
+# Maps an answer to the one for the same pair with documents A and B swapped
+_FLIPPED_ANSWER = {"A": "B", "B": "A"}
 
 
 class PRPReranker(Reranker):
@@ -26,36 +41,190 @@ class PRPReranker(Reranker):
     relevance prompting approach with an LLM.
     """
 
-    def __init__(self, llm_model_name: str, sliding_k: int = 10, backend="openrouter"):
+    def __init__(
+        self,
+        llm_model_name: str,
+        sliding_k: int = 10,
+        backend="openrouter",
+        max_concurrency: int = 4,
+        strategy: str = "sliding",
+        cache_path: Optional[str] = None,
+        max_doc_tokens: Optional[int] = 256,
+    ):
         """
         Initializes the reranker.
 
         Args:
             llm_model_name: The identifier for the LLM to be used for comparisons.
-            sliding_k: The number of sliding window passes to perform.
+            sliding_k: The number of sliding window passes to perform, i.e., the
+                number of top documents that are put in order.
+            max_concurrency: Maximum number of LLM requests in flight at once,
+                shared by all concurrently reranked queries. Keep it low for
+                rate-limited (e.g., ":free") models.
+            strategy: "sliding" for sliding window (bubble sort) passes or
+                "tournament" for tournament selection of the top sliding_k
+                documents.
+            cache_path: Optional path to an SQLite file in which LLM answers are
+                persisted, so that they are reused across runs.
+            max_doc_tokens: Approximate number of tokens each document is
+                truncated to in the prompts (about 4 characters per token).
+                None sends the full documents.
         """
+        if strategy not in ("sliding", "tournament"):
+            raise ValueError(f"Unknown PRP strategy: {strategy}")
         self._llm_model_name = llm_model_name
         self._sliding_k = sliding_k
+        self._strategy = strategy
         self._backend = backend
+        self._max_doc_chars = (
+            max_doc_tokens * _CHARS_PER_TOKEN if max_doc_tokens else None
+        )
+        self._max_concurrency = max_concurrency
+        # LLM calls that failed and left the compared pair in its current order
+        self.num_failed_comparisons = 0
+        # Created in the running event loop, as rerank() starts a new loop on
+        # every call and a semaphore cannot be shared between loops
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._disk_cache = None
+        self._disk_cache_executor = None
+        if cache_path:
+            # Lookups run in a single worker thread, so the connection is never
+            # used concurrently and the event loop is not blocked on disk I/O
+            self._disk_cache_executor = ThreadPoolExecutor(max_workers=1)
+            self._disk_cache = sqlite3.connect(
+                cache_path, isolation_level=None, check_same_thread=False
+            )
+            self._disk_cache.execute("PRAGMA journal_mode=WAL")
+            self._disk_cache.execute("PRAGMA synchronous=OFF")
+            self._disk_cache.execute(
+                "CREATE TABLE IF NOT EXISTS comparisons "
+                "(key BLOB PRIMARY KEY, answer TEXT NOT NULL)"
+            )
+
+    def close(self) -> None:
+        """Closes the on-disk cache of LLM answers, if any."""
+        if self._disk_cache is not None:
+            self._disk_cache_executor.shutdown()
+            self._disk_cache_executor = None
+            self._disk_cache.close()
+            self._disk_cache = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """
+        Returns the semaphore limiting concurrent LLM requests in the running
+        event loop, which is shared by all queries reranked in that loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
 
     def _make_pairwise_prompt(self, query: str, docA: str, docB: str) -> str:
         """Generate a prompt for pairwise comparison."""
-        return _PROMPT.format(query=query, docA=docA, docB=docB)
+        return (
+            f"{_PROMPT_PREFIX}{query}{_PROMPT_BEFORE_DOC_A}{docA}"
+            f"{_PROMPT_BEFORE_DOC_B}{docB}{_PROMPT_SUFFIX}"
+        )
 
-    def _compare_pair(self, query: str, docA: str, docB: str) -> str:
+    async def _compare_pair_async(self, query: str, docA: str, docB: str) -> str:
         """
         Uses the LLM to compare two documents for relevance to the query.
-        Caches results to avoid redundant API calls.
         """
 
         prompt = self._make_pairwise_prompt(query, docA, docB)
 
-        choice = llm_utils.call_llm(
-            prompt=prompt, model=self._llm_model_name, backend=self._backend
-        )
+        async with self._get_semaphore():
+            choice = await llm_utils.call_llm_async(
+                prompt=prompt, model=self._llm_model_name, backend=self._backend
+            )
+        if not choice:
+            # call_llm_async returns an empty answer on errors, e.g., rate limits
+            self.num_failed_comparisons += 1
 
         return choice
 
+    async def _compare_pair_cached(
+        self,
+        query: str,
+        query_digest: bytes,
+        docA_id: str,
+        docB_id: str,
+        docA: str,
+        docB: str,
+        comparison_cache: dict[tuple[bytes, str, str], str],
+    ) -> str:
+        """
+        Compares two documents, asking the LLM only once per unordered pair of
+        document IDs for a query.
+
+        The answer is stored in comparison_cache, keyed by (query digest,
+        smaller doc ID, larger doc ID), for the documents in sorted ID order and
+        flipped when the same pair is later compared in the opposite order.
+        Failed calls (empty answers) are not stored, so they are retried.
+        """
+        flipped = docA_id > docB_id
+        key = (
+            (query_digest, docB_id, docA_id)
+            if flipped
+            else (query_digest, docA_id, docB_id)
+        )
+        choice = comparison_cache.get(key)
+        if choice is None:
+            choice = await self._run_on_disk_cache(self._load_answer, key)
+            if choice is None:
+                choice = await self._compare_pair_async(query, docA, docB)
+                if flipped:
+                    choice = _FLIPPED_ANSWER.get(choice, choice)
+                await self._run_on_disk_cache(self._store_answer, key, choice)
+            if choice:
+                comparison_cache[key] = choice
+        return _FLIPPED_ANSWER.get(choice, choice) if flipped else choice
+
+    async def _run_on_disk_cache(self, func, *args):
+        """
+        Runs a disk cache operation, including the hashing of its key, in the
+        disk cache worker thread.
+        """
+        if self._disk_cache is None:
+            return None
+        return await asyncio.get_running_loop().run_in_executor(
+            self._disk_cache_executor, func, *args
+        )
+
+    def _disk_cache_key(self, key: tuple[bytes, str, str]) -> bytes:
+        """
+        Returns the on-disk cache key, which also covers the LLM and the
+        document truncation used.
+        """
+        query_digest, docA_id, docB_id = key
+        key_text = "\0".join(
+            (self._llm_model_name, str(self._max_doc_chars), docA_id, docB_id)
+        )
+        return hashlib.blake2b(
+            key_text.encode() + query_digest, digest_size=16
+        ).digest()
+
+    def _load_answer(self, key: tuple[bytes, str, str]) -> Optional[str]:
+        """Returns the persisted answer for a comparison, if any."""
+        if self._disk_cache is None:
+            return None
+        row = self._disk_cache.execute(
+            "SELECT answer FROM comparisons WHERE key = ?",
+            (self._disk_cache_key(key),),
+        ).fetchone()
+        return row[0] if row else None
+
+    def _store_answer(self, key: tuple[bytes, str, str], answer: str) -> None:
+        """Persists the answer for a comparison; failed calls are not stored."""
+        if self._disk_cache is None or not answer:
+            return
+        self._disk_cache.execute(
+            "INSERT OR REPLACE INTO comparisons (key, answer) VALUES (?, ?)",
+            (self._disk_cache_key(key), answer),
+        )
+
     def rerank(
         self,
         author_id: str,
@@ -66,6 +235,33 @@ class PRPReranker(Reranker):
         """
         Reranks a list of document IDs based on their text content.
 
+        Args:
+            author_id: The author ID whose documents are being reranked.
+            query: The user query string.
+            retrieval_results: RankedList, containing (document ID, score) tuples.
+            doc_ids_to_contents: Mapping from document IDs to their contents.
+
+        Returns:
+            Updated RankedList with reordered (document ID, score) tuples.
+        """
+        return asyncio.run(
+            self.rerank_async(author_id, query, retrieval_results, doc_ids_to_contents)
+        )
+
+    async def rerank_async(
+        self,
+        author_id: str,
+        query: str,
+        retrieval_results: RankedList,
+        doc_ids_to_contents: dict[str, str],
+    ) -> RankedList:
+        """
+        Asynchronous counterpart of `rerank`.
+
+        Comparisons within a pass depend on the preceding swaps and are awaited
+        one by one; throughput comes from reranking several queries
+        concurrently, e.g., with `asyncio.gather`.
+
         Args:
             author_id: The author ID whose documents are being reranked.
             query: The user query string.
@@ -76,34 +272,138 @@ class PRPReranker(Reranker):
             Updated RankedList with reordered (document ID, score) tuples.
         """
         n = len(retrieval_results)
-        current_rankedlist = retrieval_results.copy()
+        query_digest = hashlib.blake2b(query.encode(), digest_size=8).digest()
+        # Kept for this query only, as its keys cannot match any other query
+        comparison_cache: dict[tuple[bytes, str, str], str] = {}
+        # Documents are addressed by their initial position, so comparisons
+        # index these lists instead of probing doc_ids_to_contents
+        doc_ids = [doc_id for doc_id, _ in retrieval_results]
+        texts = [doc_ids_to_contents.get(doc_id, "") for doc_id in doc_ids]
+        if self._max_doc_chars:
+            # Truncated once here rather than for every comparison
+            texts = [_truncate(text, self._max_doc_chars) for text in texts]
+
+        if self._strategy == "tournament":
+            top_positions = await self._tournament_top_k(
+                query, query_digest, doc_ids, texts, comparison_cache
+            )
+            # The remaining documents keep their initial order
+            selected = set(top_positions)
+            positions = top_positions + [i for i in range(n) if i not in selected]
+            return [(doc_ids[pos], n + 1 - idx) for idx, pos in enumerate(positions)]
+
+        positions = list(range(n))
 
+        # Pairs starting above this index are already in their final order
+        top = 0
         for pass_num in range(self._sliding_k):
-            print(f"\n--- Pass {pass_num + 1}/{self._sliding_k} ---")
-            swapped = False
+            print(f"\n--- Pass {pass_num + 1}/{self._sliding_k} ({author_id}) ---")
+            last_swap_idx = None
             # Bottom-up comparison (least to most relevant)
-            for i in range(n - 2, -1, -1):
-                docA_id = current_rankedlist[i][0]
-                docB_id = current_rankedlist[i + 1][0]
+            for i in range(n - 2, top - 1, -1):
+                posA = positions[i]
+                posB = positions[i + 1]
 
-                winner = self._compare_pair(
+                winner = await self._compare_pair_cached(
                     query,
-                    doc_ids_to_contents.get(docA_id),
-                    doc_ids_to_contents.get(docB_id),
+                    query_digest,
+                    doc_ids[posA],
+                    doc_ids[posB],
+                    texts[posA],
+                    texts[posB],
+                    comparison_cache,
                 )
 
                 if winner == "B":
-                    current_rankedlist[i], current_rankedlist[i + 1] = (
-                        current_rankedlist[i + 1],
-                        current_rankedlist[i],
-                    )
-                    swapped = True
+                    positions[i], positions[i + 1] = posB, posA
+                    last_swap_idx = i
 
-            if not swapped:
+            if last_swap_idx is None:
                 # Early exit: No swaps in this pass, ranking is stable.
                 break
+            # Nothing moved above the last swap, so the next pass stops below it
+            top = last_swap_idx + 1
+
+        return [(doc_ids[pos], n + 1 - idx) for idx, pos in enumerate(positions)]
+
+    async def _tournament_top_k(
+        self,
+        query: str,
+        query_digest: bytes,
+        doc_ids: list[str],
+        texts: list[str],
+        comparison_cache: dict[tuple[bytes, str, str], str],
+    ) -> list[int]:
+        """
+        Selects the top sliding_k documents with a knockout tournament.
+
+        The first winner takes n - 1 comparisons in log2(n) rounds, with the
+        matches of a round run concurrently. Each following winner only replays
+        the log2(n) matches on the path of the previous winner.
+
+        Args:
+            query: The user query string.
+            query_digest: Digest of the query, used for caching comparisons.
+            doc_ids: Document IDs in their initial ranking order.
+            texts: Document contents, aligned with doc_ids.
+            comparison_cache: Answers to the comparisons made for the query.
+
+        Returns:
+            Positions in doc_ids of the top documents, most relevant first.
+        """
+
+        async def play(a, b):
+            """Returns the position of the winner; None is a bye."""
+            if a is None or b is None:
+                return b if a is None else a
+            choice = await self._compare_pair_cached(
+                query,
+                query_digest,
+                doc_ids[a],
+                doc_ids[b],
+                texts[a],
+                texts[b],
+                comparison_cache,
+            )
+            return b if choice == "B" else a
+
+        def children(level, j):
+            """Returns the two entries of level that play for slot j above it."""
+            return level[2 * j], level[2 * j + 1] if 2 * j + 1 < len(level) else None
+
+        if not doc_ids:
+            return []
+        # levels[0] holds document positions, each next level the match winners
+        levels = [list(range(len(doc_ids)))]
+        while len(levels[-1]) > 1:
+            prev = levels[-1]
+            levels.append(
+                list(
+                    await asyncio.gather(
+                        *(play(*children(prev, j)) for j in range((len(prev) + 1) // 2))
+                    )
+                )
+            )
+
+        top_positions = []
+        while len(top_positions) < self._sliding_k and levels[-1][0] is not None:
+            winner = levels[-1][0]
+            top_positions.append(winner)
+            if len(top_positions) == self._sliding_k:
+                break
+            # Remove the winner and replay the matches on its path to the root
+            levels[0][winner] = None
+            j = winner
+            for depth in range(1, len(levels)):
+                j //= 2
+                levels[depth][j] = await play(*children(levels[depth - 1], j))
+        return top_positions
+
 
-        return [
-            (doc_id, len(current_rankedlist) + 1 - idx)
-            for idx, (doc_id, _) in enumerate(current_rankedlist)
-        ]
+def _truncate(text: str, max_chars: int) -> str:
+    """Truncates text to at most max_chars characters at a word boundary."""
+    if len(text) <= max_chars:
+        return text
+    # One extra character tells whether the cut falls right after a word
+    head, _, _ = text[: max_chars + 1].rpartition(" ")
+    return head.rstrip() or text[:max_chars]
@@ -26,3 +26,24 @@ class Retriever(ABC):
             A list of (docid, score) pairs.
         """
         raise NotImplementedError("The score method must be implemented.")
+
+    def batch_score(
+        self,
+        author_id: str,
+        nl_profiles: dict[str, str],
+        top_k: int = 100,
+    ) -> dict[str, RankedList]:
+        """Score candidate items for several profiles of the same author.
+
+        Args:
+            author_id: The author/user identifier.
+            nl_profiles: Mapping from query IDs to natural language profiles.
+            top_k: Number of top results to return per profile.
+
+        Returns:
+            A dictionary mapping each query ID to a list of (docid, score) pairs.
+        """
+        return {
+            query_id: self.score(author_id, nl_profile, top_k=top_k)
+            for query_id, nl_profile in nl_profiles.items()
+        }
@@ -1,18 +1,49 @@
 """Class for natural language profile-based sparse retrieval."""
 
 import os
+from functools import lru_cache
 
 from pyserini.search.lucene import LuceneSearcher
 
 from src.models.retriever import RankedList, Retriever
 
+# Number of per-author searchers kept open
+SEARCHER_CACHE_SIZE = 128
+
 
 class SparseRetriever(Retriever):
     """BM25/QL/RM3 sparse retriever."""
 
-    def __init__(self, index_root: str, method: str = "bm25"):
+    def __init__(
+        self,
+        index_root: str,
+        method: str = "bm25",
+        searcher_cache_size: int = SEARCHER_CACHE_SIZE,
+    ):
         self.index_root = index_root
         self.method = method.lower()
+        if self.method not in ("bm25", "qld", "rm3"):
+            raise ValueError(f"Unknown sparse method: {self.method}")
+        # Opened and configured indexes are reused across queries for the
+        # same author
+        self._get_searcher = lru_cache(maxsize=searcher_cache_size)(self._open_searcher)
+
+    def _open_searcher(self, author_id: str) -> LuceneSearcher:
+        """Opens the Lucene index of an author, set up for the ranking method."""
+        searcher = LuceneSearcher(os.path.join(self.index_root, author_id))
+
+        if self.method == "bm25":
+            searcher.set_bm25()
+        elif self.method == "qld":
+            searcher.set_qld()
+        elif self.method == "rm3":
+            searcher.set_rm3()
+
+        return searcher
+
+    def clear_cache(self) -> None:
+        """Releases all cached searchers, leaving them to be garbage collected."""
+        self._get_searcher.cache_clear()
 
     def score(
         self,
@@ -25,16 +56,29 @@ class SparseRetriever(Retriever):
             print(f"[WARN] Index for {author_id} not found, skipping...")
             return []
 
-        searcher = LuceneSearcher(index_dir)
-
-        if self.method == "bm25":
-            searcher.set_bm25()
-        elif self.method == "qld":
-            searcher.set_qld()
-        elif self.method == "rm3":
-            searcher.set_rm3()
-        else:
-            raise ValueError(f"Unknown sparse method: {self.method}")
-
+        searcher = self._get_searcher(author_id)
         hits = searcher.search(nl_profile, k=top_k)
         return [(hit.docid, hit.score) for hit in hits]
+
+    def batch_score(
+        self,
+        author_id: str,
+        nl_profiles: dict[str, str],
+        top_k: int = 100,
+    ) -> dict[str, RankedList]:
+        index_dir = os.path.join(self.index_root, author_id)
+        if not os.path.exists(index_dir):
+            print(f"[WARN] Index for {author_id} not found, skipping...")
+            return {query_id: [] for query_id in nl_profiles}
+
+        searcher = self._get_searcher(author_id)
+        hits = searcher.batch_search(
+            list(nl_profiles.values()),
+            list(nl_profiles.keys()),
+            k=top_k,
+            threads=os.cpu_count(),
+        )
+        return {
+            query_id: [(hit.docid, hit.score) for hit in query_hits]
+            for query_id, query_hits in hits.items()
+        }